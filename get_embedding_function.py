@@ -1,11 +1,109 @@
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+import os
+from functools import lru_cache
 
+# CPU threads used by the embedding model: 4-8 is the sweet spot for
+# sentence-transformers, more threads only add contention.
+NUM_THREADS = min(8, os.cpu_count() or 1)
 
+
+@lru_cache(maxsize=1)
+def _init_torch():
+    """Configure the thread pools and return the torch module.
+
+    Runs once, on first use, so importing this module stays cheap. The
+    environment variables must be set before torch/tokenizers are imported.
+    """
+    os.environ.setdefault("OMP_NUM_THREADS", str(NUM_THREADS))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+    import torch
+
+    torch.set_num_threads(NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started.
+        pass
+    return torch
+
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" (default) or "onnx". The ONNX backend runs the graph-optimized export
+# shipped with the model through ONNX Runtime and requires
+# `pip install "sentence-transformers[onnx]"` (or "[onnx-gpu]" for CUDA).
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Optimized ONNX exports published in the model repository:
+# O3 is the fully optimized CPU graph, O4 adds FP16 and only runs on GPU.
+ONNX_FILE_NAME_CPU = "onnx/model_O3.onnx"
+ONNX_FILE_NAME_GPU = "onnx/model_O4.onnx"
+
+
+@lru_cache(maxsize=1)
+def _device_settings():
+    """Return DEVICE, TORCH_DTYPE and EMBEDDING_BATCH_SIZE, which need torch."""
+    torch = _init_torch()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    # On GPU the model runs in FP16 (no meaningful loss for MiniLM embeddings) and
+    # can take larger batches. FP16 on CPU is slower than FP32, so CPU keeps FP32.
+    return {
+        "DEVICE": device,
+        "TORCH_DTYPE": torch.float16 if device == "cuda" else torch.float32,
+        "EMBEDDING_BATCH_SIZE": 128 if device == "cuda" else 64,
+    }
+
+
+def __getattr__(name: str):
+    # DEVICE, TORCH_DTYPE and EMBEDDING_BATCH_SIZE are resolved on first access
+    if name in ("DEVICE", "TORCH_DTYPE", "EMBEDDING_BATCH_SIZE"):
+        return _device_settings()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _model_kwargs():
+    if EMBEDDING_BACKEND != "onnx":
+        settings = _device_settings()
+        return {"device": settings["DEVICE"], "model_kwargs": {"torch_dtype": settings["TORCH_DTYPE"]}}
+
+    import onnxruntime
+
+    if "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+        return {
+            "device": "cuda",
+            "backend": "onnx",
+            "model_kwargs": {"file_name": ONNX_FILE_NAME_GPU, "provider": "CUDAExecutionProvider"},
+        }
+    return {
+        "device": "cpu",
+        "backend": "onnx",
+        "model_kwargs": {"file_name": ONNX_FILE_NAME_CPU, "provider": "CPUExecutionProvider"},
+    }
+
+
+@lru_cache(maxsize=1)
 def get_embedding_function():
     """
     Returns the embedding model used for both ingestion and retrieval.
     Keep this consistent across ingest.py and main.py.  
+    The model is loaded once per process and shared by all callers.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    batch_size = _device_settings()["EMBEDDING_BATCH_SIZE"]
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs=_model_kwargs(),
+        encode_kwargs={"batch_size": batch_size, "normalize_embeddings": True},
+    )
+
+    return embeddings
 
-    return embeddings
\ No newline at end of file
+
+def get_sentence_transformer():
+    """
+    Returns the raw SentenceTransformer model behind the embedding function.
+    ingest.py uses it to encode chunks in large batches instead of going
+    through the LangChain wrapper.
+    """
+    return get_embedding_function()._client
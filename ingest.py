@@ -4,9 +4,10 @@ ingest.py
 This script ingests documents (PDF and TXT) into a Chroma vector database.
 It:
 1. Loads all documents from the `data/` folder.
-2. Splits them into smaller chunks for better search accuracy.
-3. Converts them into embeddings using the configured embedding model.
-4. Stores them in the Chroma DB (persistent on disk).
+2. Splits them into large parent chunks, and each parent into small child chunks.
+3. Converts the child chunks into embeddings using the configured embedding model.
+4. Stores the children in the Chroma DB and the parents in a SQLite side table
+   (both persistent on disk). Retrieval searches children and returns parents.
 
 Usage:
     python ingest.py          # Adds new documents to the database
@@ -14,20 +15,46 @@ Usage:
 """
 
 import argparse
+import itertools
+import json
 import os
+import queue
 import shutil
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from get_embedding_function import get_embedding_function
-from langchain_community.document_loaders import PyPDFDirectoryLoader, DirectoryLoader, TextLoader
+from get_embedding_function import EMBEDDING_BATCH_SIZE, get_embedding_function, get_sentence_transformer
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_chroma import Chroma
 
 # Folder containing the vector database
 CHROMA_PATH = "chroma"
 
+# SQLite file holding the parent chunks returned to the LLM
+PARENTS_PATH = os.path.join(CHROMA_PATH, "parents.sqlite3")
+
 # Folder containing all documents to ingest
 DATA_PATH = "data"
 
+# Maximum number of records sent to Chroma in a single call
+CHROMA_BATCH_SIZE = 5000
+
+# Number of chunks embedded and written to Chroma per pipeline step
+INGEST_BATCH_SIZE = 512
+
+# HNSW settings applied when the collection is created.
+# batch_size: vectors buffered before they are inserted into the HNSW graph.
+# sync_threshold: vectors added between two writes of the index to disk.
+# Raising both avoids rewriting the whole index many times during a bulk ingest.
+CHROMA_COLLECTION_METADATA = {
+    "hnsw:batch_size": 1000,
+    "hnsw:sync_threshold": 20000,
+}
+
 
 def main():
     # Check if the database should be cleared (using the --reset flag).
@@ -42,98 +69,208 @@ def main():
     # Create (or update) the data store.
     documents = load_documents()
 
-    chunks = split_documents(documents)
-    add_to_chroma(chunks)
+    parents, children = split_documents(documents)
+    save_parents(parents)
+    add_to_chroma(children)
 
 
 def load_documents():
-    """Loads all supported documents (PDF + TXT) from DATA_PATH."""
+    """Loads all supported documents (PDF + TXT) from DATA_PATH.
 
-    # Load PDFs
-    pdf_loader = PyPDFDirectoryLoader(DATA_PATH)
-    pdf_docs = pdf_loader.load()
+    Files are parsed in parallel, one file per worker process.
+    """
+    data_path = Path(DATA_PATH)
+    pdf_paths = sorted(str(p) for p in data_path.glob("**/[!.]*.pdf"))
+    txt_paths = sorted(str(p) for p in data_path.glob("**/*.txt"))
 
-    # Load TXT files
-    txt_loader = DirectoryLoader(
-        DATA_PATH, glob="**/*.txt", loader_cls=TextLoader
-    )
-    txt_docs = txt_loader.load()
+    with ProcessPoolExecutor() as executor:
+        # Load PDFs
+        pdf_docs = list(itertools.chain.from_iterable(executor.map(_load_pdf, pdf_paths)))
+
+        # Load TXT files
+        txt_docs = list(itertools.chain.from_iterable(executor.map(_load_txt, txt_paths)))
 
     # Add other file types if needed
 
     return pdf_docs + txt_docs
 
+
+# Module-level loaders so they can be pickled by ProcessPoolExecutor.
+def _load_pdf(path: str) -> list[Document]:
+    return PyPDFLoader(path).load()
+
+
+def _load_txt(path: str) -> list[Document]:
+    return TextLoader(path).load()
+
 def split_documents(documents: list[Document]):
-    """Splits documents into smaller chunks for better retrieval."""
+    """
+    Splits documents into parent chunks, and each parent into child chunks.
+
+    Only children are embedded (small chunks match queries more precisely);
+    the parent of each matching child is what gets returned to the LLM.
+    Returns (parents, children).
+
+    Each parent gets a unique ID in its metadata based on:
+    source file path : page number : chunk index
+    Example: data/manual.pdf:6:2
+    Children get "<parent id>:<child index>" and a "parent_id" metadata key.
+    """
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=80,
+    parent_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1600,
+        chunk_overlap=0,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    child_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=400,
+        chunk_overlap=40,
         length_function=len,
         is_separator_regex=False,
     )
-    return text_splitter.split_documents(documents)
+    parents = parent_splitter.split_documents(documents)
+
+    # Chunks of the same page are consecutive: number them within each group.
+    page_key = lambda chunk: (chunk.metadata.get("source"), chunk.metadata.get("page", 0))
+    for (source, page), page_chunks in itertools.groupby(parents, key=page_key):
+        for index, chunk in enumerate(page_chunks):
+            chunk.metadata["id"] = f"{source}:{page}:{index}"
+
+    children = []
+    for parent in parents:
+        parent_id = parent.metadata["id"]
+        for index, text in enumerate(child_splitter.split_text(parent.page_content)):
+            metadata = {**parent.metadata, "id": f"{parent_id}:{index}", "parent_id": parent_id}
+            children.append(Document(page_content=text, metadata=metadata))
+
+    return parents, children
+
+
+def save_parents(parents: list[Document]):
+    """Stores parent chunks in the SQLite side table, keyed by ID."""
+
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    conn = sqlite3.connect(PARENTS_PATH)
+    try:
+        with conn:  # commits on success
+            conn.execute("CREATE TABLE IF NOT EXISTS parents(id TEXT PRIMARY KEY, content TEXT, metadata TEXT)")
+            conn.executemany(
+                "INSERT OR REPLACE INTO parents(id, content, metadata) VALUES (?, ?, ?)",
+                [(p.metadata["id"], p.page_content, json.dumps(p.metadata)) for p in parents],
+            )
+    finally:
+        conn.close()
+
+
+def get_parents(ids: list[str]) -> dict[str, Document]:
+    """Returns the stored parent chunks for the given IDs (missing IDs are skipped)."""
+
+    if not ids or not os.path.exists(PARENTS_PATH):
+        return {}
+    conn = sqlite3.connect(PARENTS_PATH)
+    try:
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT id, content, metadata FROM parents WHERE id IN ({placeholders})", ids
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        row_id: Document(page_content=content, metadata=json.loads(metadata))
+        for row_id, content, metadata in rows
+    }
 
 
 def add_to_chroma(chunks: list[Document]):
-    """Stores chunks in the Chroma DB, avoiding duplicates."""
+    """Stores child chunks (with IDs from split_documents) in the Chroma DB, avoiding duplicates."""
 
     # Load the existing database.
+    embedding_function = get_embedding_function()
     db = Chroma(
-        persist_directory=CHROMA_PATH, embedding_function=get_embedding_function()
+        persist_directory=CHROMA_PATH,
+        embedding_function=embedding_function,
+        collection_metadata=CHROMA_COLLECTION_METADATA,
     )
 
-    # Calculate Page IDs.
-    chunks_with_ids = calculate_chunk_ids(chunks)
-
-    # Add or Update the documents.
-    existing_items = db.get(include=[])  # IDs are always included by default
-    existing_ids = set(existing_items["ids"])
-    print(f"Number of existing chunks in DB: {len(existing_ids)}")
+    # Only look up the candidate IDs instead of loading every ID in the DB.
+    candidate_ids = [chunk.metadata["id"] for chunk in chunks]
+    existing_ids = set()
+    for i in range(0, len(candidate_ids), CHROMA_BATCH_SIZE):
+        existing_items = db.get(ids=candidate_ids[i:i + CHROMA_BATCH_SIZE], include=[])
+        existing_ids.update(existing_items["ids"])
+    print(f"Chunks already in DB: {len(existing_ids)} of {len(candidate_ids)}")
 
     # Only add documents that don't exist in the DB.
-    new_chunks = []
-    for chunk in chunks_with_ids:
-        if chunk.metadata["id"] not in existing_ids:
-            new_chunks.append(chunk)
+    new_chunks = [
+        chunk for chunk, chunk_id in zip(chunks, candidate_ids)
+        if chunk_id not in existing_ids
+    ]
 
     if len(new_chunks):
         print(f"🔄 Adding new chunks: {len(new_chunks)}")
-        new_chunk_ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=new_chunk_ids)
+        model = get_sentence_transformer()
+
+        # Embed on this thread while a writer thread stores the previous batch,
+        # so the model does not sit idle during Chroma's writes.
+        batches = queue.Queue(maxsize=2)
+        errors = []
+        writer = threading.Thread(target=_write_batches, args=(db, batches, errors), daemon=True)
+        writer.start()
+        try:
+            for i in range(0, len(new_chunks), INGEST_BATCH_SIZE):
+                if errors:
+                    break
+                batch = new_chunks[i:i + INGEST_BATCH_SIZE]
+                texts = [chunk.page_content for chunk in batch]
+                batches.put({
+                    "ids": [chunk.metadata["id"] for chunk in batch],
+                    "embeddings": embed_texts(model, texts).tolist(),
+                    "documents": texts,
+                    "metadatas": [chunk.metadata for chunk in batch],
+                })
+        finally:
+            batches.put(None)
+            writer.join()
+
+        if errors:
+            raise errors[0]
     else:
         print("✅ No new chunk to add")
 
 
-def calculate_chunk_ids(chunks):
-    """
-    Generates a unique ID for each chunk based on:
-    source file path : page number : chunk index
-    Example: data/manual.pdf:6:2
-    """
-
-    last_page_id = None
-    current_chunk_index = 0
-
-    for chunk in chunks:
-        source = chunk.metadata.get("source")
-        page = chunk.metadata.get("page", 0)
-        current_page_id = f"{source}:{page}"
+def _write_batches(db, batches: queue.Queue, errors: list):
+    """Writer thread: adds queued batches to the collection until it gets None."""
+    while (batch := batches.get()) is not None:
+        # After a failure, keep draining the queue so the producer never blocks.
+        if errors:
+            continue
+        try:
+            # Embeddings are already computed: write directly to the collection.
+            db._collection.add(**batch)
+        except Exception as e:
+            errors.append(e)
 
-        # If the page ID is the same as the last one, increment the index.
-        if current_page_id == last_page_id:
-            current_chunk_index += 1
-        else:
-            current_chunk_index = 0
 
-        # Calculate the chunk ID.
-        chunk_id = f"{current_page_id}:{current_chunk_index}"
-        last_page_id = current_page_id
+def embed_texts(model, texts: list[str]) -> np.ndarray:
+    """
+    Encodes texts in batches of similar length so that each batch is only
+    padded to its own longest text. Returns embeddings in the input order.
+    """
 
-        # Add it to the page meta-data.
-        chunk.metadata["id"] = chunk_id
+    # Sort by length (longest first), encode, then restore the original order.
+    order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+    sorted_embeddings = model.encode(
+        [texts[i] for i in order],
+        batch_size=EMBEDDING_BATCH_SIZE,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
 
-    return chunks
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+    return embeddings
 
 
 def clear_database():
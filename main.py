@@ -14,7 +14,10 @@ Usage:
 
 import argparse
 import os
+import sys
 import time
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain_openai import ChatOpenAI
@@ -25,21 +28,28 @@ from tools.tools import TOOLS
 load_dotenv()
 
 
-def get_agent():
-    """Construct and return the LangChain agent instance.
+@lru_cache(maxsize=1)
+def get_model():
+    """Return the chat client, created once per process.
 
-    This is exported so other scripts can import and create the agent
-    on demand (avoids side-effects at import time).
+    Reusing it keeps its HTTP connection pool alive across agents and queries.
     """
     # Azure OpenAI chat client
-    model = ChatOpenAI(
+    return ChatOpenAI(
         api_key=os.getenv("AZURE_OPENAI_API_KEY"),
         base_url=os.getenv("AZURE_OPENAI_ENDPOINT"),
         model="gpt-5-mini"
     )
 
+
+def get_agent():
+    """Construct and return the LangChain agent instance.
+
+    This is exported so other scripts can import and create the agent
+    on demand (avoids side-effects at import time).
+    """
     agent = create_agent(
-        model=model,
+        model=get_model(),
         tools=TOOLS,
         system_prompt=SYSTEM_PROMPT
     )
@@ -65,10 +75,11 @@ def query_rag(agent, query: str):
     input_data = {"messages": [{"role": "user", "content": query}]}
 
     # See available stream modes in langchain docs
+    # One write per step and one flush per streamed update
     for chunk in agent.stream(input_data, stream_mode="updates"):
         for step, data in chunk.items():
-            print(f"\nstep: {step}")
-            print(f"content: {data['messages'][-1].content_blocks}")
+            sys.stdout.write(f"\nstep: {step}\ncontent: {data['messages'][-1].content_blocks}\n")
+        sys.stdout.flush()
 
     end_time = time.time()
 
@@ -3,12 +3,14 @@
 apply_tags_from_csv.py
 ----------------------
 Read a CSV file with columns: CAUSE,JOURNEY_NUM,DEP_DATE
-For each row, run the following SQL against a PostgreSQL database:
+and run the following SQL against a PostgreSQL database:
 
-1) INSERT INTO ana_tag(code, version) VALUES (%s, 42) ON CONFLICT DO NOTHING;
-2) DELETE FROM ana_tag_journey_elt WHERE code = %s;
+1) DELETE FROM ana_tag_journey_elt USING tmp_causes WHERE ana_tag_journey_elt.code = tmp_causes.code;
+   -- once, for all causes, COPY-loaded into a temp table
+2) INSERT INTO ana_tag(code, version) VALUES (%s, 42), ... ON CONFLICT DO NOTHING;
 3) INSERT INTO ana_tag_journey_elt(code, journey_id)
-   SELECT %s, id FROM net_journey WHERE (num, dep_date) IN ((%s, %s)) ON CONFLICT DO NOTHING;
+   SELECT v.code, j.id FROM (VALUES (%s, %s::<type of net_journey.num>, %s::date), ...) AS v(code, num, dep_date)
+   JOIN net_journey j ON j.num = v.num AND j.dep_date = v.dep_date ON CONFLICT DO NOTHING;
 
 Configuration via environment variables:
 - PGHOST
@@ -20,23 +22,35 @@ Configuration via environment variables:
 Usage:
     python scripts/apply_tags_from_csv.py path/to/file.csv
 
-The script uses parameterized queries (psycopg2) and executes each CSV row in its own transaction.
+The script uses parameterized queries (psycopg2). All rows are inserted with bulk
+statements (psycopg2.extras.execute_values) in a single transaction; if that
+fails, rows are retried one by one so a bad row does not abort the others.
 """
 
 import argparse
 import csv
+import io
 import os
 import sys
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 try:
     import psycopg2
+    from psycopg2.extras import execute_values
 except Exception:
     print("Missing dependency: psycopg2. Install with: pip install psycopg2-binary")
     raise
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # fall back to the csv module
+    pa = None
+
 from dotenv import load_dotenv
 
 # Load .env file if present
@@ -72,11 +86,18 @@ def get_conn():
     return conn
 
 
+EXPECTED_HEADER = ["CAUSE", "JOURNEY_NUM", "DEP_DATE"]
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y")
+
+
+@lru_cache(maxsize=65536)
 def validate_date(value: str) -> Optional[str]:
     # Accepts ISO date YYYY-MM-DD or YYYY/MM/DD. Returns value unchanged if parseable or None.
+    # Memoized: CSVs repeat a handful of distinct dates over many rows.
     if not value:
         return None
-    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y"):
+    for fmt in DATE_FORMATS:
         try:
             _ = datetime.strptime(value, fmt)
             return value
@@ -85,38 +106,157 @@ def validate_date(value: str) -> Optional[str]:
     return None
 
 
-def process_row(conn, cause: str, journey_num: str, dep_date: str):
-    """Execute SQL for a single CSV row in its own transaction."""
-    if not cause:
-        raise ValueError("CAUSE is required")
+def read_rows_csv(csv_file: str):
+    """Read the CSV with the csv module.
 
-    cur = conn.cursor()
+    Returns (rows, has_header, malformed) where rows is a list of
+    (cause, journey_num, dep_date_raw, dep_date) tuples of stripped strings,
+    dep_date being None when dep_date_raw is empty or not a valid date.
+    """
+    rows = []
+    malformed = 0
+    with open(csv_file, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        # Accept a header optionally
+        first = next(reader, None)
+        if first is None:
+            logger.error("Empty CSV file")
+            sys.exit(2)
+
+        headers_lower = [h.strip().upper() for h in first]
+        has_header = headers_lower[:3] == EXPECTED_HEADER
+
+        for r in (reader if has_header else [first, *reader]):
+            # allow rows with 3+ columns; ignore extras
+            if len(r) < 3:
+                logger.warning("Skipping malformed row (expected 3 columns): %s", r)
+                malformed += 1
+                continue
+
+            dep_date_raw = r[2].strip()
+            rows.append((r[0].strip(), r[1].strip(), dep_date_raw, validate_date(dep_date_raw)))
+
+    return rows, has_header, malformed
+
+
+def read_rows_arrow(csv_file: str):
+    """Read the CSV with pyarrow's multi-threaded parser.
+
+    Same return value as read_rows_csv. Dates are validated once per distinct
+    value and applied to the column with pyarrow.compute instead of row by row.
+    Returns None if pyarrow cannot parse the file, so the caller can fall back
+    to read_rows_csv. That includes files whose rows have different column
+    counts of 3 or more, which the csv reader accepts but pyarrow rejects.
+    """
+    malformed = 0
+
+    def skip_row(row):
+        nonlocal malformed
+        if row.actual_columns >= 3:
+            # 3+ columns but a different count than the first row: read_rows_csv accepts it
+            return "error"
+        logger.warning("Skipping malformed row (expected 3 columns): %s", row.text)
+        malformed += 1
+        return "skip"
 
     try:
-        # 1) insert into ana_tag
-        insert_tag_sql = "INSERT INTO ana_tag(code, version) VALUES (%s, 42) ON CONFLICT DO NOTHING"
-
-        # 3) insert into ana_tag_journey_elt selecting matching journeys
-        # We'll use a parameterized form for (num, dep_date) IN ((%s, %s))
-        insert_tag_journey_sql = (
-            "INSERT INTO ana_tag_journey_elt(code, journey_id)\n"
-            "SELECT %s, id FROM net_journey WHERE (num, dep_date) IN ((%s, %s)) ON CONFLICT DO NOTHING"
+        table = pacsv.read_csv(
+            csv_file,
+            read_options=pacsv.ReadOptions(autogenerate_column_names=True),
+            parse_options=pacsv.ParseOptions(delimiter=",", invalid_row_handler=skip_row),
+            convert_options=pacsv.ConvertOptions(column_types={f"f{i}": pa.string() for i in range(3)}),
         )
+    except (pa.ArrowInvalid, OSError):
+        return None
 
-        logger.debug("Prepared SQLs for cause=%s journey_num=%s dep_date=%s", cause, journey_num, dep_date)
+    if table.num_columns < 3:
+        return None
 
-        # Execute within a transaction for this row
-        cur.execute(insert_tag_sql, (cause,))
+    causes, journey_nums, dep_dates = (pc.utf8_trim_whitespace(table.column(i)) for i in range(3))
+
+    # Accept a header optionally
+    has_header = False
+    if table.num_rows and [c[0].as_py().upper() for c in (causes, journey_nums, dep_dates)] == EXPECTED_HEADER:
+        has_header = True
+        causes, journey_nums, dep_dates = causes[1:], journey_nums[1:], dep_dates[1:]
+
+    # Validate each distinct date once, then mask the whole column
+    valid_dates = pa.array([d for d in pc.unique(dep_dates).to_pylist() if validate_date(d)], pa.string())
+    valid = pc.is_in(dep_dates, value_set=valid_dates)
+    dep_dates_valid = pc.if_else(valid, dep_dates, pa.scalar(None, pa.string()))
+
+    rows = list(zip(causes.to_pylist(), journey_nums.to_pylist(), dep_dates.to_pylist(), dep_dates_valid.to_pylist()))
+    return rows, has_header, malformed
+
+
+def journey_num_type(cur) -> str:
+    """Return the SQL type of net_journey.num, used to cast the VALUES literals (text otherwise)."""
+    cur.execute(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = 'net_journey'::regclass AND attname = 'num' AND NOT attisdropped"
+    )
+    found = cur.fetchone()
+    return found[0] if found else "text"
+
+
+def insert_links(cur, link_rows: list, num_type: str):
+    """Run the two bulk INSERT statements for link_rows (no commit)."""
+    unique_causes = list(dict.fromkeys(cause for cause, _, _ in link_rows))
+
+    # 1) insert into ana_tag, one row per unique cause
+    insert_tag_sql = "INSERT INTO ana_tag(code, version) VALUES %s ON CONFLICT DO NOTHING"
+    execute_values(cur, insert_tag_sql, [(c, 42) for c in unique_causes], page_size=1000)
+
+    # 2) insert into ana_tag_journey_elt selecting matching journeys
+    # VALUES literals are text: cast them to the column types so the join compares
+    # like types. Rows with an empty journey_num or dep_date simply match nothing.
+    insert_tag_journey_sql = (
+        "INSERT INTO ana_tag_journey_elt(code, journey_id)\n"
+        "SELECT v.code, j.id FROM (VALUES %s) AS v(code, num, dep_date)\n"
+        "JOIN net_journey j ON j.num = v.num AND j.dep_date = v.dep_date ON CONFLICT DO NOTHING"
+    )
+    template = f"(%s, NULLIF(%s, '')::{num_type}, %s::date)"
+    execute_values(cur, insert_tag_journey_sql, link_rows, template=template, page_size=1000)
+
+
+def insert_rows(conn, link_rows: list) -> int:
+    """Insert all tags and journey links with bulk statements in a single transaction.
+
+    link_rows is a list of (cause, journey_num, dep_date) tuples. If the bulk
+    statements fail (e.g. a journey_num that does not cast to the type of
+    net_journey.num, or a date Postgres cannot parse), the rows are retried one by one, each under its own
+    savepoint, so a bad row only loses itself. Returns the number of failed rows.
+    """
+    cur = conn.cursor()
 
-        # If journey_num or dep_date are empty, the SELECT will likely match nothing
-        cur.execute(insert_tag_journey_sql, (cause, journey_num, dep_date))
+    try:
+        num_type = journey_num_type(cur)
+        try:
+            insert_links(cur, link_rows, num_type)
+            conn.commit()
+            logger.info("Inserted %d journey link row(s)", len(link_rows))
+            return 0
+        except psycopg2.Error:
+            conn.rollback()
+            logger.warning("Bulk insert failed, retrying row by row", exc_info=True)
 
+        failed = 0
+        for row in link_rows:
+            cur.execute("SAVEPOINT link_row")
+            try:
+                insert_links(cur, [row], num_type)
+                cur.execute("RELEASE SAVEPOINT link_row")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT link_row")
+                logger.warning("Failed to insert row %s: %s", row, str(e).strip())
+                failed += 1
         conn.commit()
-        logger.info("Processed cause=%s journey_num=%s dep_date=%s", cause, journey_num, dep_date)
+        logger.info("Inserted %d journey link row(s), %d failed", len(link_rows) - failed, failed)
+        return failed
 
     except Exception:
         conn.rollback()
-        logger.exception("Failed to process row cause=%s journey_num=%s dep_date=%s", cause, journey_num, dep_date)
+        logger.exception("Failed to insert tags and journey links")
         raise
     finally:
         cur.close()
@@ -130,45 +270,34 @@ def main():
         sys.exit(2)
 
     # Read CSV
-    rows = []
-    with open(args.csv_file, newline="", encoding="utf-8") as fh:
-        reader = csv.reader(fh)
-        # Accept a header optionally
-        first = next(reader, None)
-        if first is None:
-            logger.error("Empty CSV file")
-            sys.exit(2)
-
-        headers_lower = [h.strip().upper() for h in first]
-        has_header = False
-        if headers_lower[:3] == ["CAUSE", "JOURNEY_NUM", "DEP_DATE"]:
-            has_header = True
-        else:
-            # assume first line was data
-            rows.append(first)
-
-        for r in reader:
-            rows.append(r)
+    result = read_rows_arrow(args.csv_file) if pa else None
+    if result is None:
+        result = read_rows_csv(args.csv_file)
+    rows, has_header, malformed = result
 
     logger.info("Read %d data rows (header=%s)", len(rows), has_header)
 
     conn = get_conn()
 
     # Collect unique CAUSE codes and execute a single delete before processing rows
-    causes = []
-    for r in rows:
-        if len(r) >= 1:
-            c = r[0].strip()
-            if c:
-                causes.append(c)
+    causes = [cause for cause, _, _, _ in rows if cause]
 
     unique_causes = list(dict.fromkeys(causes))  # preserve order, unique
     if unique_causes:
         logger.info("Deleting existing ana_tag_journey_elt entries for %d unique cause(s)", len(unique_causes))
         cur = conn.cursor()
         try:
-            delete_all_sql = "DELETE FROM ana_tag_journey_elt WHERE code = ANY(%s)"
-            cur.execute(delete_all_sql, (unique_causes,))
+            # Bulk-load the causes into a temp table with COPY, then delete with a join
+            cur.execute("CREATE TEMP TABLE tmp_causes(code text PRIMARY KEY) ON COMMIT DROP")
+            buf = io.StringIO()
+            csv.writer(buf).writerows([c] for c in unique_causes)
+            buf.seek(0)
+            cur.copy_expert("COPY tmp_causes(code) FROM STDIN WITH (FORMAT csv)", buf)
+            delete_all_sql = (
+                "DELETE FROM ana_tag_journey_elt USING tmp_causes "
+                "WHERE ana_tag_journey_elt.code = tmp_causes.code"
+            )
+            cur.execute(delete_all_sql)
             conn.commit()
             logger.info("Deleted existing ana_tag_journey_elt rows for provided causes")
         except Exception:
@@ -179,31 +308,29 @@ def main():
             cur.close()
 
     processed = 0
-    errors = 0
-
-    try:
-        for r in rows:
-            # allow rows with 3+ columns; ignore extras
-            if len(r) < 3:
-                logger.warning("Skipping malformed row (expected 3 columns): %s", r)
-                errors += 1
-                continue
+    errors = malformed
 
-            cause = r[0].strip()
-            journey_num = r[1].strip()
-            dep_date_raw = r[2].strip()
+    link_rows = []
+    for cause, journey_num, dep_date_raw, dep_date in rows:
+        if not cause:
+            logger.warning("Skipping row without CAUSE: %s", (cause, journey_num, dep_date_raw))
+            errors += 1
+            continue
 
-            dep_date = validate_date(dep_date_raw)
-            if dep_date_raw and not dep_date:
-                logger.warning("Row has invalid date format, still passing through as string: %s", dep_date_raw)
-                dep_date = dep_date_raw
+        if dep_date_raw and not dep_date:
+            # Postgres may still parse it; rows it rejects are isolated by insert_rows
+            logger.warning("Row has invalid date format, still passing through as string: %s", dep_date_raw)
+            dep_date = dep_date_raw
 
-            try:
-                process_row(conn, cause, journey_num, dep_date)
-                processed += 1
-            except Exception:
-                errors += 1
+        link_rows.append((cause, journey_num, dep_date))
 
+    try:
+        if link_rows:
+            failed = insert_rows(conn, link_rows)
+            processed = len(link_rows) - failed
+            errors += failed
+    except Exception:
+        errors += len(link_rows)
     finally:
         if conn:
             conn.close()
@@ -14,13 +14,33 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from tools.journey_tools import extract_journey_info
+from tools.journey_tools import extract_journey_info_batch
+
+# Number of rows sent to the extractor at once
+BATCH_SIZE = 64
 
 
 def process(csv_path: Path, out_path: Path, text_column: str | None = None):
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with csv_path.open(newline='', encoding='utf-8') as fh_in, out_path.open('w', encoding='utf-8') as fh_out:
+
+        def flush(buf):
+            outs = extract_journey_info_batch([text for _, text in buf])
+            for (row, _), json_out in zip(buf, outs):
+                # attach original row id if exists
+                try:
+                    uid = row.get('id') or row.get('journey_id')
+                except Exception:
+                    uid = None
+
+                payload = {
+                    'source_id': uid,
+                    'extracted': json.loads(json_out),
+                }
+                fh_out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
         reader = csv.DictReader(fh_in)
+        buf = []
         for row in reader:
             if text_column and text_column in row:
                 text = row[text_column]
@@ -28,18 +48,13 @@ def process(csv_path: Path, out_path: Path, text_column: str | None = None):
                 # merge all columns
                 text = " ".join([str(v) for v in row.values() if v])
 
-            json_out = extract_journey_info(text)
-            # attach original row id if exists
-            try:
-                uid = row.get('id') or row.get('journey_id')
-            except Exception:
-                uid = None
-
-            payload = {
-                'source_id': uid,
-                'extracted': json.loads(json_out),
-            }
-            fh_out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            buf.append((row, text))
+            if len(buf) >= BATCH_SIZE:
+                flush(buf)
+                buf = []
+
+        if buf:
+            flush(buf)
 
 
 def main():
@@ -14,7 +14,6 @@ it falls back to a deterministic comparator (max/min load_factor).
 import argparse
 import json
 import os
-import re
 import sys
 import time
 
@@ -62,17 +61,16 @@ def try_agent_query(agent, query: str, timeout: float = 30.0) -> str:
 
 
 def extract_first_json(text: str):
-    # Try to extract the first {...} block
-    m = re.search(r"\{.*?\}\s*$", text, re.S)
-    if not m:
-        m = re.search(r"\{.*?\}", text, re.S)
-    if not m:
-        return None
-    candidate = m.group(0)
-    try:
-        return json.loads(candidate)
-    except Exception:
-        return None
+    # Decode the first valid {...} object, scanning forward from each '{'
+    decoder = json.JSONDecoder()
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, _ = decoder.raw_decode(text, i)
+            return obj
+        except json.JSONDecodeError:
+            i = text.find("{", i + 1)
+    return None
 
 
 def deterministic_result(trains: list[dict]):
@@ -1,6 +1,6 @@
 """Run unit tests for the project without requiring pytest.
 
-This script imports the test module and runs each test function, reporting failures.
+This script imports the test modules and runs each test function, reporting failures.
 """
 import importlib
 import sys
@@ -12,13 +12,22 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 
+TEST_MODULES = (
+    "tests.test_journey_tools",
+    "tests.test_semantic_cache",
+    "tests.test_strategy_tools",
+)
+
+
 def run_tests():
-    mod = importlib.import_module("tests.test_journey_tools")
-    test_funcs = [
-        getattr(mod, name)
-        for name in dir(mod)
-        if name.startswith("test_") and callable(getattr(mod, name))
-    ]
+    test_funcs = []
+    for module_name in TEST_MODULES:
+        mod = importlib.import_module(module_name)
+        test_funcs += [
+            getattr(mod, name)
+            for name in dir(mod)
+            if name.startswith("test_") and callable(getattr(mod, name))
+        ]
 
     failures = 0
     for f in test_funcs:
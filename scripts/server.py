@@ -1,110 +1,168 @@
 """Simple server to serve static demo and API endpoint.
 
 Usage:
-  python3 scripts/server.py
+  python3 scripts/server.py [--workers N]
 
 Endpoints:
   GET /api/journeys -> returns JSON array of extracted records (from output/journeys.jsonl)
   Static files served from `public/` (index at /public/journey_dashboard_demo.html)
+
+The app is a Starlette ASGI application served by uvicorn (uvloop event loop,
+several worker processes), so a slow client no longer blocks the others.
+It can also be started directly with:
+  uvicorn server:app --app-dir scripts --workers 4 --loop uvloop
 """
-import http.server
 import json
-import socketserver
+import mmap
+import os
+from operator import itemgetter
 from pathlib import Path
-from urllib.parse import urlparse, parse_qs
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, Response
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
 
 PORT = 8000
+WORKERS = 4
 ROOT = Path(__file__).resolve().parents[1]
 OUTPUT = ROOT / 'output' / 'journeys.jsonl'
 PUBLIC = ROOT / 'public'
 
+# Parsed content of OUTPUT, reused until the file changes on disk
+_CACHE = {'mtime': None, 'size': None, 'data': None}
+
+
+def _loads(line: bytes):
+    if orjson:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity, which older records may contain
+            pass
+    return json.loads(line)
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
-class Handler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path.startswith('/api/journeys'):
-            if not OUTPUT.exists():
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b'[]')
-                return
-
-            # parse query params
-            parsed = urlparse(self.path)
-            params = parse_qs(parsed.query)
-            top = int(params.get('top', [0])[0])
-            bottom = int(params.get('bottom', [0])[0])
-            limit = int(params.get('limit', [0])[0])
-            journey_id = params.get('journey_id', [None])[0]
-            min_confidence = params.get('min_confidence', [None])[0]
-
-            arr = []
-            with OUTPUT.open('r', encoding='utf-8') as fh:
-                for line in fh:
-                    try:
-                        obj = json.loads(line)
-                    except Exception:
-                        continue
-                    # normalize confidence for filtering
-                    conf = obj.get('extracted', {}).get('confidence')
-                    if min_confidence and conf != min_confidence:
-                        continue
-                    arr.append(obj)
-
-            # apply journey_id filter first
-            if journey_id:
-                arr = [a for a in arr if str(a.get('source_id')) == str(journey_id) or str(a.get('extracted', {}).get('journey_id')) == str(journey_id)]
-
-            # convert to enriched objects with numeric score for sorting
-            def score_num(item):
-                s = item.get('extracted', {}).get('score')
+
+def load_journeys() -> list:
+    """Return all records of OUTPUT, parsing the file only when it has changed."""
+    st = os.stat(OUTPUT)
+    if _CACHE['mtime'] == st.st_mtime_ns and _CACHE['size'] == st.st_size:
+        return _CACHE['data']
+
+    data = []
+    if st.st_size:
+        with OUTPUT.open('rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                if not line.strip():
+                    continue
                 try:
-                    return float(s)
+                    data.append(_loads(line))
                 except Exception:
-                    return float('nan')
-
-            # sort by score desc
-            arr_sorted = sorted(arr, key=lambda x: (score_num(x) if not (score_num(x) != score_num(x)) else -999999), reverse=True)
-
-            result = None
-            if top > 0:
-                result = arr_sorted[:top]
-            elif bottom > 0:
-                # bottom: lowest scores
-                arr_sorted_bottom = sorted(arr, key=lambda x: (score_num(x) if not (score_num(x) != score_num(x)) else 999999))
-                result = arr_sorted_bottom[:bottom]
-            else:
-                result = arr_sorted
-
-            if limit > 0:
-                result = result[:limit]
-
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
-            return
-
-        # serve static files from public/
-        if self.path == '/' or self.path == '/index.html':
-            self.path = '/public/journey_dashboard_demo.html'
+                    continue
+
+    _CACHE.update(mtime=st.st_mtime_ns, size=st.st_size, data=data)
+    return data
+
+
+def select_journeys(arr: list, top: int = 0, bottom: int = 0, limit: int = 0,
+                    journey_id: str | None = None, min_confidence: str | None = None) -> list:
+    """Filter and sort journey records the way /api/journeys query params describe."""
+    # normalize confidence for filtering
+    if min_confidence:
+        arr = [a for a in arr if a.get('extracted', {}).get('confidence') == min_confidence]
+
+    # apply journey_id filter first
+    if journey_id:
+        arr = [a for a in arr if str(a.get('source_id')) == str(journey_id) or str(a.get('extracted', {}).get('journey_id')) == str(journey_id)]
+
+    # compute each score once, keeping items without a numeric score apart
+    def score_num(item):
+        s = item.get('extracted', {}).get('score')
+        try:
+            return float(s)
+        except Exception:
+            return float('nan')
+
+    scored = []
+    unscored = []
+    for a in arr:
+        score = score_num(a)
+        if score != score:  # NaN
+            unscored.append(a)
         else:
-            # rewrite path to public if it's not an API path
-            if self.path.startswith('/public/'):
-                pass
-            else:
-                # attempt to serve from public first
-                self.path = '/public' + self.path
+            scored.append((score, a))
+
+    # sort once by score: desc for top/default, asc for bottom; unscored items last
+    result = None
+    if top > 0:
+        scored.sort(key=itemgetter(0), reverse=True)
+        result = ([a for _, a in scored[:top]] + unscored)[:top]
+    elif bottom > 0:
+        # bottom: lowest scores
+        scored.sort(key=itemgetter(0))
+        result = ([a for _, a in scored[:bottom]] + unscored)[:bottom]
+    else:
+        scored.sort(key=itemgetter(0), reverse=True)
+        result = [a for _, a in scored] + unscored
+
+    if limit > 0:
+        result = result[:limit]
+
+    return result
+
+
+async def api_journeys(request):
+    if not OUTPUT.exists():
+        return Response(b'[]', status_code=404)
+
+    # parse query params
+    params = request.query_params
+    top = int(params.get('top', 0))
+    bottom = int(params.get('bottom', 0))
+    limit = int(params.get('limit', 0))
+    journey_id = params.get('journey_id')
+    min_confidence = params.get('min_confidence')
+
+    # file I/O and parsing run off the event loop
+    arr = await run_in_threadpool(load_journeys)
+    result = select_journeys(arr, top, bottom, limit, journey_id, min_confidence)
+    return Response(_dumps(result), media_type='application/json; charset=utf-8')
 
-        return http.server.SimpleHTTPRequestHandler.do_GET(self)
+
+async def index(request):
+    return FileResponse(PUBLIC / 'journey_dashboard_demo.html')
+
+
+# serve static files from public/, both under /public/ and at the root
+app = Starlette(routes=[
+    Route('/api/journeys', api_journeys),
+    Route('/', index),
+    Route('/index.html', index),
+    Mount('/public', app=StaticFiles(directory=PUBLIC)),
+    Mount('/', app=StaticFiles(directory=PUBLIC, html=True)),
+])
 
 
 if __name__ == '__main__':
-    import os
-    os.chdir(str(ROOT))
-    with socketserver.TCPServer(('', PORT), Handler) as httpd:
-        print(f"Serving at http://localhost:{PORT} (CTRL+C to quit)")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print('Stopping server')
-            httpd.server_close()
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    print(f"Serving at http://localhost:{args.port} (CTRL+C to quit)")
+    uvicorn.run('server:app', app_dir=str(Path(__file__).resolve().parent), host='0.0.0.0',
+                port=args.port, workers=args.workers, loop='uvloop')
@@ -39,9 +39,8 @@ def test_refine_with_mock_llm():
         # Return a valid JSON object embedded in text
         return 'Here is the JSON:\n{"journey_id": "42", "score": "-1.5", "reason": "crew shortage", "solution": "reassign crew"}'
 
-    out = refine_extraction_with_llm(sample, llm_predict=mock_predict)
-    assert out is not None
-    obj = json.loads(out)
+    obj = refine_extraction_with_llm(sample, llm_predict=mock_predict)
+    assert obj is not None
     assert obj["journey_id"] == "42"
     assert obj["confidence"] == "llm"
 
@@ -59,3 +58,95 @@ def test_extractor_uses_llm_when_low_confidence():
     obj = json.loads(out)
     assert obj["confidence"] == "llm"
     assert obj["score_numeric"] == -1.5
+
+
+def test_batch_extraction_matches_single():
+    from tools.journey_tools import extract_journey_info_batch
+
+    texts = [
+        "JourneyId: 12345\nScore: 2.5\nReason: On-time performance improved.",
+        "The journey 789 had a severe issue because of a late crew.",
+        "   ",
+    ]
+    outs = extract_journey_info_batch(texts)
+    assert outs == [extract_journey_info(t) for t in texts]
+
+
+def test_fallback_keeps_id_and_score_inside_reason_sentences():
+    j = json.loads(extract_journey_info("Delay on journey 12345 because of signal failure."))
+    assert j["journey_id"] == "12345"
+    assert "because" in j["reason"]
+
+    j = json.loads(extract_journey_info("We recommend checking journey 98765 soon"))
+    assert j["journey_id"] == "98765"
+    assert j["solution"] == "We recommend checking journey 98765 soon"
+
+    j = json.loads(extract_journey_info("Train late because journey 4567 had score 2.5"))
+    assert j["journey_id"] == "4567"
+    assert j["score"] == "2.5"
+
+
+def test_repeated_text_still_refined_by_llm():
+    sample = "Journey 77 was late again."
+    calls = []
+
+    def mock_predict(prompt: str) -> str:
+        calls.append(prompt)
+        return '{"journey_id":"77","score":"-2","reason":"late","solution":null}'
+
+    first = json.loads(extract_journey_info(sample))
+    # the cached fallback result must not bypass the LLM refinement
+    second = json.loads(extract_journey_info(sample, llm_predict=mock_predict))
+    assert first["confidence"] == "low"
+    assert second["confidence"] == "llm"
+    assert len(calls) == 1
+
+
+def test_refine_uses_first_json_object():
+    from tools.journey_tools import refine_extraction_with_llm
+
+    def mock_predict(prompt: str) -> str:
+        return 'First {"journey_id": "1", "reason": "a } in text"} then {"journey_id": "2"}'
+
+    obj = refine_extraction_with_llm("Journey 1 text", llm_predict=mock_predict)
+    assert obj["journey_id"] == "1"
+    assert obj["reason"] == "a } in text"
+
+
+def test_structured_and_freeform_entry_points():
+    from tools.journey_tools import extract_journey_info_freeform, extract_journey_info_structured
+
+    block = "JourneyId: 12345\nScore: 2.5"
+    prose = "The journey 789 was late because of a crew change."
+    assert extract_journey_info_structured(block) == extract_journey_info(block)
+    assert extract_journey_info_freeform(prose) == extract_journey_info(prose)
+    # each entry point only runs its own pass
+    assert json.loads(extract_journey_info_structured(prose))["journey_id"] is None
+    assert json.loads(extract_journey_info_freeform(block))["confidence"] == "low"
+
+
+def test_llm_numeric_fields_are_serialized():
+    def mock_predict(prompt: str) -> str:
+        return '{"journey_id": 123456789012345678901234567890, "score": 123456789012345678901234567890}'
+
+    obj = json.loads(extract_journey_info("Journey text without details.", llm_predict=mock_predict))
+    assert obj["journey_id"] == "123456789012345678901234567890"
+    assert obj["score"] == 123456789012345678901234567890
+    assert obj["confidence"] == "llm"
+
+
+def test_refine_repairs_malformed_json():
+    from tools import journey_tools
+    from tools.journey_tools import refine_extraction_with_llm
+
+    if journey_tools.repair_json is None:  # optional dependency (json-repair)
+        return
+
+    def mock_predict(prompt: str) -> str:
+        return 'Result: {journey_id: "5", "score": "1.5", "reason": "late crew",}'
+
+    obj = refine_extraction_with_llm("Journey 5 text", llm_predict=mock_predict)
+    assert obj is not None
+    assert obj["journey_id"] == "5"
+    assert obj["score"] == "1.5"
+    assert obj["confidence"] == "llm"
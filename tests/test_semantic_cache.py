@@ -0,0 +1,77 @@
+import numpy as np
+
+from tools.semantic_cache import ProximityCache
+
+
+def _unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_hit_within_tau_and_miss_outside():
+    cache = ProximityCache(capacity=8, tau=0.1)
+    cache.add(_unit(1, 0, 0), "docs-a")
+
+    # cosine distance ~0.005: served from the cache
+    assert cache.lookup(_unit(1, 0.1, 0)) == "docs-a"
+    # orthogonal query (distance 1.0): miss
+    assert cache.lookup(_unit(0, 1, 0)) is None
+
+
+def test_evicts_oldest_entry_at_capacity():
+    cache = ProximityCache(capacity=2, tau=0.01)
+    cache.add(_unit(1, 0, 0), "a")
+    cache.add(_unit(0, 1, 0), "b")
+    cache.add(_unit(0, 0, 1), "c")
+
+    assert len(cache) == 2
+    assert cache.lookup(_unit(1, 0, 0)) is None
+    assert cache.lookup(_unit(0, 1, 0)) == "b"
+    assert cache.lookup(_unit(0, 0, 1)) == "c"
+
+
+def _fill(cache, vectors):
+    for i, v in enumerate(vectors):
+        cache.add(v, i)
+    # hide entry 0 from its LSH bucket: only the full scan can find it
+    key = cache._slot_keys[0]
+    cache._buckets[key].discard(0)
+    return vectors[0]
+
+
+def test_lsh_bucket_miss_falls_back_to_full_scan():
+    vectors = np.random.default_rng(1).standard_normal((40, 16)).astype(np.float32)
+
+    # below lsh_min_size every entry is scanned
+    small = ProximityCache(capacity=64, tau=0.05, n_bits=4, lsh_min_size=64)
+    assert small.lookup(_fill(small, vectors)) == 0
+
+    # from lsh_min_size on, the bucket is scanned first, then every entry
+    large = ProximityCache(capacity=64, tau=0.05, n_bits=4, lsh_min_size=32)
+    assert large.lookup(_fill(large, vectors)) == 0
+    for i, v in enumerate(vectors):
+        assert large.lookup(v) == i
+
+
+def _at_distance(v, distance, rng):
+    # unit vector at the given cosine distance from unit vector v
+    u = rng.standard_normal(v.shape[0]).astype(np.float32)
+    u -= (u @ v) * v
+    u /= np.linalg.norm(u)
+    cos = 1.0 - distance
+    return cos * v + np.sqrt(1.0 - cos * cos) * u
+
+
+def test_full_cache_serves_near_duplicates():
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((1024, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # same settings as the retrieval cache: full, so the LSH index is in use
+    cache = ProximityCache(capacity=1024, tau=0.12)
+    for i, v in enumerate(vectors):
+        cache.add(v, i)
+
+    for distance in (0.02, 0.05, 0.10):
+        queries = [(i, _at_distance(vectors[i], distance, rng)) for i in range(0, 1024, 8)]
+        hits = sum(cache.lookup(q) == i for i, q in queries)
+        assert hits == len(queries), (distance, hits)
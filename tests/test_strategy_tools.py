@@ -0,0 +1,68 @@
+import json
+
+import tools.strategy_tools as strategy_tools
+
+
+class _FakeResponse:
+    content = b'{"content": []}'
+    text = '{"content": []}'
+
+    def raise_for_status(self):
+        pass
+
+
+def _posted_body(criteria):
+    sent = {}
+
+    def fake_post(url, **kwargs):
+        sent["url"] = url
+        sent.update(kwargs)
+        return _FakeResponse()
+
+    # patched by hand so scripts/run_unit_tests.py can run these without pytest
+    base_url = strategy_tools.BASE_URL
+    strategy_tools.BASE_URL = "http://appia5.test"
+    strategy_tools._SESSION.post = fake_post
+    try:
+        out = strategy_tools.search_strategies.invoke(criteria)
+    finally:
+        strategy_tools.BASE_URL = base_url
+        del strategy_tools._SESSION.post  # back to requests.Session.post
+    assert json.loads(out) == {"content": []}
+    assert sent["url"] == "http://appia5.test/api/strategies/search"
+    assert sent["headers"]["Content-Type"] == "application/json"
+    # passed per request: a session-level verify is overridden by REQUESTS_CA_BUNDLE
+    assert sent["verify"] is False
+    return json.loads(sent["data"])
+
+
+def test_search_body_sends_sets_as_lists():
+    body = _posted_body({
+        "types": ["AU_SETTING", "FINAL_AU_SETTING"],
+        "codes": ["S1"],
+        "valid": True,
+    })
+    assert sorted(body["types"]) == ["AU_SETTING", "FINAL_AU_SETTING"]
+    assert body["codes"] == ["S1"]
+    assert body["valid"] is True
+    # defaults of the criteria model are still sent, None fields are dropped
+    assert body["page"] == 0 and body["size"] == 25 and body["sort"] == []
+    assert "name" not in body
+
+
+def test_search_body_encodes_nested_models():
+    body = _posted_body({
+        "sort": [{"property": "code", "direction": "DESC"}],
+        "createdAt": {"start": "2024-01-01", "end": None},
+    })
+    assert body["sort"] == [{"property": "code", "direction": "DESC"}]
+    assert body["createdAt"] == {"start": "2024-01-01"}
+
+
+def test_search_rejects_unknown_strategy_type():
+    try:
+        _posted_body({"types": ["NOT_A_TYPE"]})
+    except ValueError as e:
+        assert "NOT_A_TYPE" in str(e)
+    else:
+        raise AssertionError("unknown strategy type was accepted")
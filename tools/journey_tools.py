@@ -14,19 +14,130 @@ from __future__ import annotations
 
 import json
 import re
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
-# LangChain tool support
 try:
-    from pydantic import BaseModel
-    from langchain.tools import tool
-except Exception:  # If langchain/pydantic are not installed, we still keep the core functionality.
-    BaseModel = None
-    tool = None
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+
+# Optional: schema-checked decoding and repair of LLM replies
+try:
+    import msgspec
+except ImportError:  # fall back to json.loads + dict lookups
+    msgspec = None
+try:
+    from json_repair import repair_json
+except ImportError:  # malformed replies are then dropped
+    repair_json = None
+
+def _dumps(obj) -> str:
+    if orjson:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. integers beyond 64 bits from an LLM reply
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+if msgspec:
+    class _LlmExtract(msgspec.Struct):
+        """Fields read from an LLM reply; other keys are ignored.
+
+        Values are left untyped: models often answer numbers for ids and scores.
+        """
+        journey_id: Any = None
+        score: Any = None
+        reason: Any = None
+        solution: Any = None
+
+
+def _first_json_object(s: str) -> Optional[str]:
+    """Return the first balanced {...} span of `s`, or None.
+
+    A single scan tracking brace depth and JSON strings (braces inside strings
+    are ignored), so replies with several objects or extra prose stay linear.
+    """
+    start = s.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(s)):
+        c = s[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return s[start:i + 1]
+    return None
+
+
+def _decode_llm_fields(jtext: str) -> Dict:
+    """Decode a JSON object reply into the journey_id/score/reason/solution fields."""
+    if msgspec:
+        return msgspec.to_builtins(msgspec.json.decode(jtext, type=_LlmExtract))
+    obj = json.loads(jtext)
+    return {
+        "journey_id": obj.get("journey_id"),
+        "score": obj.get("score"),
+        "reason": obj.get("reason"),
+        "solution": obj.get("solution"),
+    }
+
+
+# Precompiled patterns (avoids the re module cache lookup on every call)
+_INLINE_SCORE_RE = re.compile(r"score\s*[=:]\s*([-+]?[0-9]*\.?[0-9]+)", re.I)
+_STANDALONE_NUM_RE = re.compile(r"\b([-+]?[0-9]*\.?[0-9]{1,3})\b")
+# Fallback fields. Each is searched on its own: a journey id or score often sits
+# inside the reason/solution sentence, so one non-overlapping pass would lose it.
+_JOURNEY_ID_RE = re.compile(r"journey[^0-9]{0,8}([0-9]{3,})", re.I)
+_SCORE_CTX_RE = re.compile(r"score[^0-9\-+]{0,6}([-+]?[0-9]*\.?[0-9]+)", re.I)
+_REASON_RE = re.compile(r"[^.\n]{0,200}(?:reason|because|raison)[^.\n]{0,200}", re.I)
+_SOLUTION_RE = re.compile(r"[^.\n]{0,200}(?:solution|fix|recommend|recommendation|proposed)[^.\n]{0,200}", re.I)
+
+# Recognized "key: value" keys (lowercased) and the output field they fill
+_KEY_MAP = {
+    "journeyid": "journey_id",
+    "journey_id": "journey_id",
+    "journey id": "journey_id",
+    "id": "journey_id",
+    "score": "score",
+    "reason": "reason",
+    "raison": "reason",
+    "raisonnement": "reason",
+    "solution": "solution",
+}
+# Fields where the first occurrence wins (others keep the last one)
+_FIRST_WINS = frozenset(("reason", "solution"))
+
+# Result for empty or whitespace-only input
+_EMPTY_RESULT = {
+    "journey_id": None,
+    "score": None,
+    "reason": None,
+    "solution": None,
+    "confidence": "low",
+    "note": "no structured data found; see excerpt",
+    "excerpt": "",
+    "score_numeric": None,
+}
 
 
 def _heuristic_extract(text: str) -> Optional[Dict[str, str]]:
-    """Try fast heuristic extraction using regex and keywords.
+    """Try fast heuristic extraction using a key:value line scan and keywords.
 
     Looks for lines like:
       JourneyId: 12345
@@ -41,27 +152,26 @@ def _heuristic_extract(text: str) -> Optional[Dict[str, str]]:
     if not lines:
         return None
 
-    # try to find key:value patterns
+    # try to find key:value patterns (the key ends at the first ':' or '=')
     data = {}
-    kv_re = re.compile(r"^(?P<key>journey[_ ]?id|id|score|reason|solution|raison|raisonnement)\s*[:=]\s*(?P<val>.+)$", re.I)
     for line in lines:
-        m = kv_re.match(line)
-        if m:
-            key = m.group("key").lower()
-            val = m.group("val").strip()
-            # normalize keys
-            if "journey" in key or key == "id":
-                data["journey_id"] = val
-            elif "score" in key:
-                data["score"] = val
-            elif "reason" in key or "raison" in key:
-                data.setdefault("reason", val)
-            elif "solution" in key:
-                data.setdefault("solution", val)
+        key, sep, val = line.partition(":")
+        if "=" in key or not sep:
+            key, sep, val = line.partition("=")
+            if not sep:
+                continue
+        field = _KEY_MAP.get(key.rstrip().lower())
+        val = val.strip()
+        if field is None or not val:
+            continue
+        if field in _FIRST_WINS:
+            data.setdefault(field, val)
+        else:
+            data[field] = val
 
     # Also try inline patterns like "score = -2.5" inside text
     if "score" not in data:
-        m = re.search(r"score\s*[=:]\s*([-+]?[0-9]*\.?[0-9]+)", text, re.I)
+        m = _INLINE_SCORE_RE.search(text)
         if m:
             data["score"] = m.group(1)
 
@@ -84,73 +194,132 @@ def extract_journey_info(text: str, llm_predict: Optional[callable] = None) -> s
 
     The function first runs a fast heuristic. If nothing is found, it uses a
     conservative fallback that picks a short excerpt for human review and marks
-    confidence as 'low'.
+    confidence as 'low'. Both passes are cached per text; only low-confidence
+    results are sent to `llm_predict`.
+
+    Callers that know the shape of their input can use
+    extract_journey_info_structured (key: value blocks) or
+    extract_journey_info_freeform (prose) directly.
+    """
+    # 0) Empty input: nothing to extract, skip all the passes below
+    if not text or text.isspace():
+        return _dumps(_EMPTY_RESULT)
+
+    # 1) Heuristic pass. Both key:value lines and inline "score = x" need a
+    # ':' or '=', so prose without them goes straight to the fallback.
+    if ":" in text or "=" in text:
+        result = _structured_json(text)
+        if result is not None:
+            return result
+
+    # 2) Fallback (and LLM refinement)
+    return _freeform(text, llm_predict)
+
+
+def extract_journey_info_structured(text: str) -> str:
+    """Extract journey information from `key: value` lines only (no fallback, no LLM).
+
+    Meant for tidy tool output. Returns the same schema as extract_journey_info;
+    if no known key is found the result is low confidence with an excerpt.
+    """
+    if not text or text.isspace():
+        return _dumps(_EMPTY_RESULT)
+    result = _structured_json(text)
+    if result is None:
+        return _dumps(_no_data_result(text))
+    return result
+
+
+def extract_journey_info_freeform(text: str, llm_predict: Optional[callable] = None) -> str:
+    """Extract journey information from prose: keyword fallback, then LLM refinement.
+
+    Skips the key:value heuristic. Returns the same schema as extract_journey_info.
+    """
+    if not text or text.isspace():
+        return _dumps(_EMPTY_RESULT)
+    return _freeform(text, llm_predict)
+
+
+def _freeform(text: str, llm_predict: Optional[callable]) -> str:
+    result = _fallback_json(text)
+
+    # The fallback is always low confidence: refine if an llm_predict is provided
+    if llm_predict:
+        refined = refine_extraction_with_llm(text, llm_predict=llm_predict)
+        if refined:
+            return _dumps(_coerce_and_validate(refined))
+    return result
+
+
+@lru_cache(maxsize=256)
+def _structured_json(text: str) -> Optional[str]:
+    """Run the heuristic pass on non-empty text; JSON string or None if nothing found.
+
+    Results only depend on the text, so repeated excerpts (common across agent
+    steps) are served from the cache.
     """
-    # 1) Heuristic pass
     heur = _heuristic_extract(text)
-    if heur:
-        # ensure keys exist
-        out = {
-            "journey_id": heur.get("journey_id", None),
-            "score": heur.get("score", None),
-            "reason": heur.get("reason", None),
-            "solution": heur.get("solution", None),
-            "confidence": "heuristic",
-        }
-        # validate/coerce
-        out = _coerce_and_validate(out)
-        return json.dumps(out, ensure_ascii=False)
-
-    # 2) Fallback: simple extractor that tries to guess with keywords and context
-    # This is intentionally conservative: we don't hallucinate, only pick short
-    # spans near likely keywords.
-    lower = text.lower()
+    if not heur:
+        return None
+    # ensure keys exist
+    out = {
+        "journey_id": heur.get("journey_id", None),
+        "score": heur.get("score", None),
+        "reason": heur.get("reason", None),
+        "solution": heur.get("solution", None),
+        "confidence": "heuristic",
+    }
+    # validate/coerce
+    out = _coerce_and_validate(out)
+    return _dumps(out)
+
+
+@lru_cache(maxsize=256)
+def _fallback_json(text: str) -> str:
+    """Run the keyword fallback on non-empty text and return the low-confidence JSON string.
+
+    This is intentionally conservative: we don't hallucinate, only pick short
+    spans near likely keywords.
+    """
     out = {"journey_id": None, "score": None, "reason": None, "solution": None}
 
     # Journey id: look for 'journey' + digits
-    m = re.search(r"journey[^0-9]{0,8}([0-9]{3,})", lower)
+    m = _JOURNEY_ID_RE.search(text)
     if m:
         out["journey_id"] = m.group(1)
 
     # Score: nearest number after 'score' or stand-alone pattern
-    m = re.search(r"score[^0-9\-+]{0,6}([-+]?[0-9]*\.?[0-9]+)", lower)
+    m = _SCORE_CTX_RE.search(text)
     if m:
         out["score"] = m.group(1)
     else:
         # try standalone numeric patterns that are short
-        m2 = re.search(r"\b([-+]?[0-9]*\.?[0-9]{1,3})\b", lower)
-        if m2:
-            out["score"] = m2.group(1)
+        m = _STANDALONE_NUM_RE.search(text)
+        if m:
+            out["score"] = m.group(1)
 
     # reason: grab sentence with 'reason' or 'because' or french 'raison'
-    reason_match = re.search(r"([^.\n]{0,200}(reason|because|raison)[^.\n]{0,200})", text, re.I)
-    if reason_match:
-        out["reason"] = reason_match.group(1).strip()
+    m = _REASON_RE.search(text)
+    if m:
+        out["reason"] = m.group(0).strip()
 
     # solution: look for lines containing 'solution', 'fix', 'recommend'
-    sol_match = re.search(r"([^.\n]{0,200}(solution|fix|recommend|recommendation|proposed)[^.\n]{0,200})", text, re.I)
-    if sol_match:
-        out["solution"] = sol_match.group(1).strip()
+    m = _SOLUTION_RE.search(text)
+    if m:
+        out["solution"] = m.group(0).strip()
 
     confidence = "low"
     # if we found at least one meaningful value, keep the fallback output
     if any([out["journey_id"], out["score"], out["reason"], out["solution"]]):
         result = {**out, "confidence": confidence}
         result = _coerce_and_validate(result)
-        # if low confidence and an llm_predict is provided, try to refine
-        if result.get("confidence") == "low" and llm_predict:
-            refined = refine_extraction_with_llm(text, llm_predict=llm_predict)
-            if refined:
-                try:
-                    parsed = json.loads(refined)
-                    parsed = _coerce_and_validate(parsed)
-                    return json.dumps(parsed, ensure_ascii=False)
-                except Exception:
-                    return refined
-        return json.dumps(result, ensure_ascii=False)
+        return _dumps(result)
 
     # Nothing found: return minimal JSON with excerpt for human inspection
-    excerpt = text.strip()[:400]
+    return _dumps(_no_data_result(text))
+
+
+def _no_data_result(text: str) -> Dict:
     result = {
         "journey_id": None,
         "score": None,
@@ -158,44 +327,50 @@ def extract_journey_info(text: str, llm_predict: Optional[callable] = None) -> s
         "solution": None,
         "confidence": "low",
         "note": "no structured data found; see excerpt",
-        "excerpt": excerpt,
+        "excerpt": text.strip()[:400],
     }
-    result = _coerce_and_validate(result)
-    # If LLM caller provided, attempt to refine
-    if llm_predict:
-        refined = refine_extraction_with_llm(text, llm_predict=llm_predict)
-        if refined:
-            try:
-                parsed = json.loads(refined)
-                parsed = _coerce_and_validate(parsed)
-                return json.dumps(parsed, ensure_ascii=False)
-            except Exception:
-                return refined
-    return json.dumps(result, ensure_ascii=False)
+    return _coerce_and_validate(result)
+
 
+def extract_journey_info_batch(texts: List[str], llm_predict: Optional[callable] = None) -> List[str]:
+    """Extract journey information for several texts at once.
 
-def _coerce_and_validate(payload: Dict[str, Optional[str]]) -> Dict:
+    Returns one JSON string per input text, in the same order, each with the
+    same schema as extract_journey_info. Batch callers (e.g. the CSV
+    extractor) should go through this entry point so that a batched model
+    call can be plugged in here without changing them.
+    """
+    return [extract_journey_info(text, llm_predict=llm_predict) for text in texts]
+
+
+def _coerce_and_validate(out: Dict) -> Dict:
     """Normalize keys and coerce score to float when possible.
 
-    Returns a payload dict with:
+    Works in place on `out` (callers always pass a freshly built dict) and
+    returns it with:
       - journey_id as string or None
       - score as string if original (keeps string) and numeric converted stored in 'score_numeric'
       - reason, solution, confidence
     """
-    out = dict(payload)
     # Normalize empty strings to None
-    for k in ["journey_id", "score", "reason", "solution"]:
+    for k in ("journey_id", "score", "reason", "solution"):
         v = out.get(k)
-        if isinstance(v, str) and v.strip() == "":
+        if isinstance(v, str) and not v.strip():
             out[k] = None
 
+    # LLM replies may give the id as a number
+    journey_id = out.get("journey_id")
+    if journey_id is not None and not isinstance(journey_id, str):
+        out["journey_id"] = str(journey_id)
+
     # Coerce score to float if possible and add numeric key
     score = out.get("score")
     score_num = None
-    if score is not None:
+    # float() accepts numbers and surrounding whitespace directly, no str() round-trip
+    if isinstance(score, (str, int, float)) and not isinstance(score, bool):
         try:
-            score_num = float(str(score).strip())
-        except Exception:
+            score_num = float(score)
+        except (ValueError, OverflowError):
             score_num = None
     out["score_numeric"] = score_num
     return out
@@ -206,7 +381,12 @@ def _coerce_and_validate(payload: Dict[str, Optional[str]]) -> Dict:
 # ---------------------------------------------------------------------------
 # LangChain tool wrapper (optional)
 # ---------------------------------------------------------------------------
-if BaseModel and tool:
+# Built on first access: importing LangChain is slow and not needed by the
+# extractor itself (e.g. in the unit tests).
+def _build_langchain_tool():
+    from pydantic import BaseModel
+    from langchain.tools import tool
+
     class JourneyToolArgs(BaseModel):
         text: str
 
@@ -216,8 +396,21 @@ if BaseModel and tool:
         """Tool wrapper for LangChain agents. Returns the same JSON string as extract_journey_info."""
         return extract_journey_info(text)
 
+    return JourneyToolArgs, extract_journey_info_tool
+
+
+def __getattr__(name: str):
+    if name in ("JourneyToolArgs", "extract_journey_info_tool"):
+        try:
+            args, wrapped = _build_langchain_tool()
+        except ImportError as e:  # If langchain/pydantic are not installed, we still keep the core functionality.
+            raise AttributeError(f"{name} requires langchain and pydantic") from e
+        globals().update(JourneyToolArgs=args, extract_journey_info_tool=wrapped)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-def refine_extraction_with_llm(text: str, llm_predict: Optional[callable] = None) -> Optional[str]:
+def refine_extraction_with_llm(text: str, llm_predict: Optional[callable] = None) -> Optional[Dict]:
         """Try to refine/complete the extraction using an LLM.
 
         Parameters:
@@ -225,7 +418,8 @@ def refine_extraction_with_llm(text: str, llm_predict: Optional[callable] = None
             - llm_predict: optional callable that accepts a single prompt string and returns the LLM's reply string.
 
         Returns:
-            - JSON string (same schema as extract_journey_info) if LLM provided and returns valid JSON; otherwise None.
+            - dict with journey_id, score, reason, solution and confidence "llm" if LLM provided and returns
+              valid JSON; otherwise None. extract_journey_info coerces and serializes it.
 
         Notes:
             - This helper does not call external APIs by default. Provide `llm_predict` to enable an actual LLM call.
@@ -245,19 +439,18 @@ def refine_extraction_with_llm(text: str, llm_predict: Optional[callable] = None
         try:
                 reply = llm_predict(prompt)
                 # Attempt to parse reply; be liberal and search for first JSON object
-                m = re.search(r"(\{[\s\S]*\})", reply)
-                if m:
-                        jtext = m.group(1)
-                        obj = json.loads(jtext)
+                jtext = _first_json_object(reply)
+                if jtext:
+                        try:
+                                final = _decode_llm_fields(jtext)
+                        except Exception:
+                                # models regularly emit slightly malformed JSON
+                                if repair_json is None:
+                                        raise
+                                final = _decode_llm_fields(repair_json(jtext))
                         # ensure the expected keys exist
-                        final = {
-                                "journey_id": obj.get("journey_id"),
-                                "score": obj.get("score"),
-                                "reason": obj.get("reason"),
-                                "solution": obj.get("solution"),
-                                "confidence": "llm",
-                        }
-                        return json.dumps(final, ensure_ascii=False)
+                        final["confidence"] = "llm"
+                        return final
         except Exception:
                 return None
 
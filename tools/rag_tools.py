@@ -6,11 +6,38 @@ RAG retrieval tool that wraps the Chroma vector database.
 This tool allows the agent to search the Appia documentation when needed.
 """
 
-from langchain_chroma import Chroma
 from langchain.tools import tool
 from langchain_core.documents import Document
-from get_embedding_function import get_embedding_function
-from ingest import CHROMA_PATH
+from pydantic import BaseModel, Field
+from tools.semantic_cache import ProximityCache
+
+# Chroma, the embedding model (torch) and ingest are imported on first use in
+# _get_db(): they are slow to load and only needed once the tool is called.
+
+# Retrieval results for recent queries, keyed by query embedding.
+# Near-duplicate queries are answered without a vector search.
+_CACHE = ProximityCache(capacity=1024, tau=0.12)
+
+# Embedding model and Chroma handle, opened on first use and reused across calls.
+_EMBED = None
+_DB = None
+
+
+def _get_db():
+    """Return the shared Chroma handle, loading the embedding model on the first call."""
+    global _EMBED, _DB
+    if _DB is None:
+        from langchain_chroma import Chroma
+        from get_embedding_function import get_embedding_function
+        from ingest import CHROMA_COLLECTION_METADATA, CHROMA_PATH
+
+        _EMBED = get_embedding_function()
+        _DB = Chroma(
+            persist_directory=CHROMA_PATH,
+            embedding_function=_EMBED,
+            collection_metadata=CHROMA_COLLECTION_METADATA,
+        )
+    return _DB
 
 
 @tool(response_format="content_and_artifact")
@@ -27,13 +54,85 @@ def retrieve_context(query: str) -> tuple[str, list[Document]]:
     Returns:
         A tuple of (formatted_context_text, list_of_source_documents)
     """
-    embedding_function = get_embedding_function()
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
-    
-    results = db.similarity_search_with_score(query, k=4)
-    
-    # Extract documents and format context
-    docs = [doc for doc, _score in results]
+    docs = _retrieve([query])[0]
+
+    # Format context
     context_text = "\n\n---\n\n".join([doc.page_content for doc in docs])
     
     return context_text, docs
+
+
+class RetrieveContextBatchArgs(BaseModel):
+    queries: list[str] = Field(..., description="Search queries to run against the documentation")
+
+
+@tool("retrieve_context_batch", args_schema=RetrieveContextBatchArgs, response_format="content_and_artifact")
+def retrieve_context_batch(queries: list[str]) -> tuple[str, list[Document]]:
+    """
+    Retrieve context from the Appia documentation for several queries at once.
+
+    Prefer this over several retrieve_context calls when you already know all the
+    questions to look up: the queries are embedded and searched in a single pass.
+
+    Args:
+        queries: The search queries to find relevant documentation
+
+    Returns:
+        A tuple of (formatted_context_text, list_of_source_documents). The context
+        text has one section per query, in the order given.
+    """
+    results = _retrieve(queries)
+
+    sections = []
+    for query, docs in zip(queries, results):
+        context_text = "\n\n---\n\n".join([doc.page_content for doc in docs])
+        sections.append(f"Query: {query}\n\n{context_text}")
+
+    return "\n\n===\n\n".join(sections), [doc for docs in results for doc in docs]
+
+
+def _retrieve(queries: list[str]) -> list[list[Document]]:
+    """Return the parent documents for each query.
+
+    All queries are embedded in one forward pass, and the ones not answered by the
+    cache are searched with a single Chroma query.
+    """
+    db = _get_db()
+    embeddings = _EMBED.embed_documents(queries)
+
+    results = [_CACHE.lookup(embedding) for embedding in embeddings]
+    misses = [i for i, docs in enumerate(results) if docs is None]
+    if misses:
+        found = db._collection.query(
+            query_embeddings=[embeddings[i] for i in misses],
+            n_results=8,
+            include=["documents", "metadatas", "distances"],
+        )
+        for row, i in enumerate(misses):
+            children = [
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(found["documents"][row], found["metadatas"][row])
+            ]
+            results[i] = _to_parents(children, k=4)
+            _CACHE.add(embeddings[i], results[i])
+    return results
+
+
+def _to_parents(children: list[Document], k: int) -> list[Document]:
+    """Replace matched child chunks by their parent chunks (deduplicated, best match first)."""
+    from ingest import get_parents
+
+    parents = get_parents(list({c.metadata["parent_id"] for c in children if "parent_id" in c.metadata}))
+
+    docs = []
+    seen = set()
+    for child in children:
+        # Chunks ingested before parent-child splitting have no parent: keep them as is.
+        key = child.metadata.get("parent_id", child.metadata.get("id"))
+        if key in seen:
+            continue
+        seen.add(key)
+        docs.append(parents.get(key, child))
+        if len(docs) == k:
+            break
+    return docs
@@ -0,0 +1,108 @@
+"""
+semantic_cache.py
+-----------------
+Approximate (proximity) cache for retrieval results.
+
+Near-duplicate questions retrieve the same documents, so the cache is keyed by
+the query embedding rather than the query text: a lookup returns the results
+stored for the closest cached embedding if its cosine distance is within `tau`.
+
+Candidates are found with a single matrix-vector product over the cached
+embeddings. Once the cache holds `lsh_min_size` entries, a random-projection
+LSH index first scans only the entries sharing the query's bucket. A close
+neighbour can sit across one of the hyperplanes, so when the bucket holds no
+entry within `tau` the lookup falls back to the full scan.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class ProximityCache:
+    """Fixed-capacity cache mapping query embeddings to retrieved documents.
+
+    Entries are evicted in insertion order (FIFO) once `capacity` is reached.
+    """
+
+    def __init__(self, capacity: int = 1024, tau: float = 0.12, n_bits: int = 16,
+                 lsh_min_size: int = 1024, seed: int = 0):
+        self.capacity = capacity
+        self.tau = tau
+        self.n_bits = n_bits
+        self.lsh_min_size = lsh_min_size
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Remove all entries."""
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim), allocated on first add
+        self._planes: Optional[np.ndarray] = None  # (n_bits, dim) LSH hyperplanes
+        self._values: List[Any] = [None] * self.capacity
+        self._slot_keys: List[Optional[bytes]] = [None] * self.capacity
+        self._buckets: Dict[bytes, set] = {}
+        self._size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _normalize(self, vector) -> np.ndarray:
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        return q / norm if norm else q
+
+    def _bucket_key(self, q: np.ndarray) -> bytes:
+        return np.packbits(self._planes @ q > 0).tobytes()
+
+    def lookup(self, vector) -> Optional[Any]:
+        """Return the cached value for the nearest embedding within `tau`, else None."""
+        with self._lock:
+            if not self._size:
+                return None
+            q = self._normalize(vector)
+
+            if self._size >= self.lsh_min_size:
+                candidates = self._buckets.get(self._bucket_key(q))
+                if candidates:
+                    slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+                    hit = self._nearest(slots, q)
+                    if hit is not None:
+                        return self._values[hit]
+
+            hit = self._nearest(np.arange(self._size), q)
+            return None if hit is None else self._values[hit]
+
+    def _nearest(self, slots: np.ndarray, q: np.ndarray) -> Optional[int]:
+        """Return the slot among `slots` closest to `q` if within `tau`, else None."""
+        distances = 1.0 - self._vectors[slots] @ q
+        best = int(np.argmin(distances))
+        return int(slots[best]) if distances[best] <= self.tau else None
+
+    def add(self, vector, value: Any):
+        """Store `value` for the given query embedding, evicting the oldest entry if full."""
+        with self._lock:
+            q = self._normalize(vector)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                self._planes = self._rng.standard_normal((self.n_bits, q.shape[0])).astype(np.float32)
+
+            slot = self._next
+            old_key = self._slot_keys[slot]
+            if old_key is not None:
+                bucket = self._buckets[old_key]
+                bucket.discard(slot)
+                if not bucket:
+                    del self._buckets[old_key]
+
+            key = self._bucket_key(q)
+            self._vectors[slot] = q
+            self._values[slot] = value
+            self._slot_keys[slot] = key
+            self._buckets.setdefault(key, set()).add(slot)
+
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
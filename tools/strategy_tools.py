@@ -21,14 +21,21 @@ Notes for hackathon participants
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langchain_core.tools import tool
-from typing import Optional, Set, Dict, Any
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Set, Dict, Any
+from pydantic import BaseModel, Field, WithJsonSchema, field_validator
 from enum import Enum
 from dotenv import load_dotenv
 from models.criteria import AuditedCriteriaModel
 import urllib3
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+
 # Temporarily disable Insecure request warning !! DO NOT USE IN PROD !!
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -37,8 +44,40 @@ load_dotenv()
 BASE_URL = os.getenv("APPIA5_BASE_URL")
 TOKEN = os.getenv("APPIA5_API_TOKEN")
 
+# One pooled session for all tool calls, so TCP/TLS connections are kept alive.
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2))
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
+_SESSION.headers.update({"Accept": "application/json"})
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _dumps(obj) -> str:
+    return orjson.dumps(obj).decode() if orjson else json.dumps(obj)
+
+
+def _json_default(o):
+    """Encode the criteria values JSON has no type for (set fields, nested models, enums)."""
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, BaseModel):
+        return o.model_dump(exclude_none=True)
+    if isinstance(o, Enum):
+        return o.value
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _encode_body(obj) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, default=_json_default)
+    return json.dumps(obj, default=_json_default).encode("utf-8")
+
+
 def _headers():
-    h = {"Accept": "application/json"}
+    h = {}
     if TOKEN:
         h["Authorization"] = f"Bearer {TOKEN}"
     return h
@@ -62,6 +101,12 @@ class StrategyTypeEnum(str, Enum):
     SPOILAGE_ALLOCATION = "SPOILAGE_ALLOCATION"
 
 
+# Valid StrategyType names, checked with a set lookup instead of building enum members
+_STRATEGY_TYPE_VALUES = frozenset(e.value for e in StrategyTypeEnum)
+# Plain string that still advertises the allowed names in the tool schema
+_StrategyTypeName = Annotated[str, WithJsonSchema({"type": "string", "enum": [e.value for e in StrategyTypeEnum]})]
+
+
 class StrategyCriteriaModel(AuditedCriteriaModel):
     """
     StrategyCriteria fields (Java) mirrored in Python.
@@ -80,13 +125,23 @@ class StrategyCriteriaModel(AuditedCriteriaModel):
     name: Optional[str] = Field(default=None)
     description: Optional[str] = Field(default=None)
     valid: Optional[bool] = Field(default=None)
-    types: Optional[Set[StrategyTypeEnum]] = Field(
+    types: Optional[Set[_StrategyTypeName]] = Field(
         default=None,
         description="Enum names of StrategyType, e.g. {'AU_SETTING','FINAL_AU_SETTING'}"
     )
     journeyGroups: Optional[Set[str]] = Field(default=None)
     onDemandStrategyListOwners: Optional[Set[str]] = Field(default=None)
 
+    @field_validator("types")
+    @classmethod
+    def _check_types(cls, v):
+        if v is None:
+            return v
+        bad = v - _STRATEGY_TYPE_VALUES
+        if bad:
+            raise ValueError(f"Invalid StrategyType: {sorted(bad)}")
+        return v
+
 # POST /api/strategies/search
 @tool("search_strategies", args_schema=StrategyCriteriaModel)
 def search_strategies(**kwargs) -> str:
@@ -102,26 +157,29 @@ def search_strategies(**kwargs) -> str:
 
     url = f"{BASE_URL}/api/strategies/search"
 
-    # Build criteria from kwargs
-    criteria = StrategyCriteriaModel(**kwargs)
-    tmp = criteria.model_dump(exclude_none=True)
+    # Build criteria from kwargs (already validated against args_schema by LangChain)
+    tmp = {k: v for k, v in kwargs.items() if v is not None}
     
     criteria_dict: Optional[Dict[str, Any]] = None
     if tmp: 
-        if "types" in tmp and tmp["types"] is not None:
-            tmp["types"] = [t.value for t in tmp["types"]]
+        # sets and nested models are encoded by _json_default, no conversion here
         criteria_dict = tmp
 
     try:
         if criteria_dict is None:
-            resp = requests.post(url, headers=_headers(), verify=False)
+            resp = _SESSION.post(url, headers=_headers(), verify=False)
         else:
-            resp = requests.post(url, json=criteria_dict, headers=_headers(), verify=False)
+            resp = _SESSION.post(
+                url,
+                data=_encode_body(criteria_dict),
+                headers={**_headers(), "Content-Type": "application/json"},
+                verify=False,
+            )
 
         resp.raise_for_status()
 
         try:
-            return json.dumps(resp.json())
+            return _dumps(_loads(resp.content))
         except ValueError:
             print( resp.text[:10000])
             return resp.text[:10000]
@@ -1,17 +1,29 @@
-from tools.journey_tools import extract_journey_info
-from tools.rag_tools import retrieve_context
-from tools.strategy_tools import search_strategies
-
 # search_strategies is a tool that fetches data from appia5 endpoint.
 # retrieve_context is a RAG tool that queries Chroma DB.
+# retrieve_context_batch runs several RAG queries in one embedding pass and one search.
 # code_interpreter allows to run code.
 # OpenAPI supports multiple "native" tool types. See https://platform.openai.com/docs/guides/tools
-TOOLS = [retrieve_context, search_strategies, extract_journey_info] + [
-    {
-        "type": "code_interpreter",
-        "container": {"type": "auto"}
-    }
-]
+#
+# TOOLS is built on first access, so importing this module does not load
+# LangChain, Chroma and the embedding model until the agent actually needs them.
+def _build_tools():
+    from tools.journey_tools import extract_journey_info
+    from tools.rag_tools import retrieve_context, retrieve_context_batch
+    from tools.strategy_tools import search_strategies
+
+    return [retrieve_context, retrieve_context_batch, search_strategies, extract_journey_info] + [
+        {
+            "type": "code_interpreter",
+            "container": {"type": "auto"}
+        }
+    ]
+
+
+def __getattr__(name: str):
+    if name == "TOOLS":
+        globals()["TOOLS"] = tools = _build_tools()
+        return tools
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -----------------------------------------------------------------------------
 # How to add another tool for appia5
@@ -19,7 +31,7 @@ TOOLS = [retrieve_context, search_strategies, extract_journey_info] + [
 # 1) Define a Pydantic args schema if needed (class MyToolArgs(BaseModel): ...).
 # 2) Write a function that performs the work and returns a string/JSON string.
 # 3) Decorate it with @tool("my_tool_name", args_schema=MyToolArgs).
-# 4) Add it to TOOLS.
+# 4) Add it to the list returned by _build_tools().
 # 5) Ask questions naturally; the model may choose to call your tool if relevant.
 #
 # Keep tools small and predictable: clear inputs, clear outputs, clear errors.